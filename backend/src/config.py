@@ -0,0 +1,27 @@
+import os
+from functools import lru_cache
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+
+@lru_cache
+def settings() -> SimpleNamespace:
+    """
+    Reads .env + environment once per process (on first use, not at import).
+    """
+    load_dotenv()
+
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        raise RuntimeError("GROQ_API_KEY is missing in .env")
+
+    return SimpleNamespace(
+        groq_api_key=groq_api_key,
+        # Using a larger model if available (70b) is better for formatting compliance.
+        # e.g. NOTES_MODEL="llama-3.1-8b-instant" if rate limits are an issue.
+        notes_model=os.getenv("NOTES_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct"),
+        # HyDE costs one extra Groq round-trip per unit before retrieval can start.
+        # Off by default: the query is expanded locally from the syllabus instead.
+        use_hyde=os.getenv("NOTES_USE_HYDE", "false").lower() in ("1", "true", "yes"),
+    )
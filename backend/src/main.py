@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -7,6 +9,8 @@ from src.routes.hyde_generate import router as hyde_router
 from src.routes.retrieve import router as retrieve_router
 from src.routes.generate_notes import router as notes_router
 from src.routes.export_notes import router as export_notes_router
+from src.services.groq_client import close_client, close_sync_client, get_client
+from src.services.vector_store import warm_bm25_index
 
 app = FastAPI(title="Syllabus GPT - HyDE + RAG Backend")
 
@@ -18,6 +22,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_groq_pool():
+    # Pay the TLS handshake now instead of on the first notes request
+    try:
+        await get_client().models.list()
+    except Exception as e:
+        print(f"[WARN] Groq pre-warm failed: {e}")
+
+
+@app.on_event("startup")
+async def warm_bm25():
+    # Reads + tokenizes every chunk once, so the first notes request doesn't pay for it
+    try:
+        await asyncio.to_thread(warm_bm25_index)
+    except Exception as e:
+        print(f"[WARN] BM25 pre-warm failed: {e}")
+
+
+@app.on_event("shutdown")
+async def close_groq_pool():
+    await close_client()
+    close_sync_client()
+
+
 @app.get("/")
 def home():
     return {"message": "Backend running successfully!"}
@@ -36,13 +36,15 @@ def generate_notes(req: NotesRequest):
             detail=f"Notes generation failed: {str(e)}"
         )
 """
+import asyncio
+
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
-from src.services.notes_llm import generate_final_notes
+from src.services.notes_llm import generate_final_notes_async, stream_final_notes
 from src.services.export_notes import generate_beautiful_pdf
-from src.services.vector_store import retrieve_relevant_context
+from src.services.vector_store import retrieve_relevant_context_async
 
 router = APIRouter(
     prefix="/notes",
@@ -63,14 +65,14 @@ class NotesAndPdfRequest(NotesRequest):
 
 
 @router.post("/generate")
-def generate_notes(req: NotesRequest):
+async def generate_notes(req: NotesRequest):
     """
     Step 1: Generate ONLY markdown notes (no PDF).
     Useful for preview or debugging.
     """
     try:
         # (A) Get RAG context
-        context = retrieve_relevant_context(
+        context = await retrieve_relevant_context_async(
             syllabus_text=req.syllabus_text,
             subject=req.subject,
             use_pyq=req.use_pyq,
@@ -78,7 +80,7 @@ def generate_notes(req: NotesRequest):
         )
 
         # (B) Generate final notes markdown using LLM
-        notes_md = generate_final_notes(
+        notes_md = await generate_final_notes_async(
             syllabus_text=req.syllabus_text,
             subject=req.subject,
             use_pyq=req.use_pyq,
@@ -97,15 +99,48 @@ def generate_notes(req: NotesRequest):
         )
 
 
+def _sse(data: str, event: str | None = None) -> str:
+    """
+    Format one Server-Sent Event. Multi-line data needs one `data:` line per line.
+    """
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_notes_stream(req: NotesRequest):
+    """
+    Same as /generate, but streams the markdown as Server-Sent Events
+    so the client can render the notes while they are being generated.
+    """
+    async def event_stream():
+        try:
+            async for piece in stream_final_notes(
+                syllabus_text=req.syllabus_text,
+                subject=req.subject,
+                use_pyq=req.use_pyq,
+                top_k=req.top_k,
+            ):
+                if piece:
+                    yield _sse(piece)
+            yield _sse("", event="done")
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield _sse(f"Notes generation failed: {str(e)}", event="error")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.post("/generate-and-export/pdf")
-def generate_notes_and_pdf(req: NotesAndPdfRequest):
+async def generate_notes_and_pdf(req: NotesAndPdfRequest):
     """
     Full pipeline in ONE call:
       syllabus_text (+subject) -> RAG -> notes markdown -> PDF file
     """
     try:
         # (A) Generate full notes markdown
-        notes_md = generate_final_notes(
+        notes_md = await generate_final_notes_async(
             syllabus_text=req.syllabus_text,
             subject=req.subject,
             use_pyq=req.use_pyq,
@@ -127,7 +162,8 @@ def generate_notes_and_pdf(req: NotesAndPdfRequest):
         filename = req.filename or "notes.pdf"
 
         # (C) Generate PDF from markdown
-        pdf_path = generate_beautiful_pdf(
+        pdf_path = await asyncio.to_thread(
+            generate_beautiful_pdf,
             markdown_text=notes_md,
             filename=filename,
             title=title,
@@ -0,0 +1,44 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Optional
+
+# === Paths ===
+CACHE_DB_PATH = "./llm-cache.sqlite3"
+
+# One table per cached call
+CACHE_TABLES = ("hyde_cache", "topics_cache", "retrieval_cache")
+
+# === SQLite connection (shared by FastAPI worker threads) ===
+_conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+_lock = threading.Lock()
+
+with _lock:
+    for _table in CACHE_TABLES:
+        _conn.execute(f"CREATE TABLE IF NOT EXISTS {_table} (key TEXT PRIMARY KEY, value TEXT)")
+    _conn.commit()
+
+
+def make_key(*parts) -> str:
+    """sha256 over all the inputs that influence the cached result."""
+    raw = "\x1f".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _check_table(table: str):
+    if table not in CACHE_TABLES:
+        raise ValueError(f"Unknown cache table: {table}")
+
+
+def cache_get(table: str, key: str) -> Optional[str]:
+    _check_table(table)
+    with _lock:
+        row = _conn.execute(f"SELECT value FROM {table} WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def cache_set(table: str, key: str, value: str):
+    _check_table(table)
+    with _lock:
+        _conn.execute(f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)", (key, value))
+        _conn.commit()
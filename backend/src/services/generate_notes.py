@@ -1,19 +1,8 @@
-import os
-from dotenv import load_dotenv
-from groq import Groq
-
+from src.services.groq_client import get_sync_client
 from src.routes.parse_topics import parse_syllabus_into_topics
 from src.services.hyde_llm import generate_hyde_document
 from src.services.vector_store import retrieve_relevant_context
 
-load_dotenv()
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("Missing GROQ_API_KEY in .env")
-
-client = Groq(api_key=GROQ_API_KEY)
-
 
 # -----------------------------------------------------------
 # Final Notes Generator
@@ -55,7 +44,7 @@ Now write the notes:
 - Make it look like a handwritten guide for exam preparation
 """
 
-    response = client.chat.completions.create(
+    response = get_sync_client().chat.completions.create(
         model="meta-llama/llama-4-scout-17b-16e-instruct",  # recommended stable model
         messages=[{"role": "user", "content": prompt}],
         temperature=0.25,
@@ -0,0 +1,57 @@
+import threading
+from typing import Optional
+
+import httpx
+from groq import AsyncGroq, Groq
+
+from src.config import settings
+
+# === Connection pool shared by every Groq call in this worker ===
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+_client: Optional[AsyncGroq] = None
+_sync_client: Optional[Groq] = None
+_lock = threading.Lock()
+
+
+def get_client() -> AsyncGroq:
+    """Shared AsyncGroq client (notes pipeline, async HyDE)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = AsyncGroq(
+                    api_key=settings().groq_api_key,
+                    http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+                )
+    return _client
+
+
+def get_sync_client() -> Groq:
+    """Shared sync Groq client for the plain `def` routes and helpers."""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = Groq(
+                    api_key=settings().groq_api_key,
+                    http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+                )
+    return _sync_client
+
+
+async def close_client():
+    """Closes the shared async pool (app shutdown, or end of a sync-wrapper loop)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def close_sync_client():
+    """Closes the shared sync pool (app shutdown)."""
+    global _sync_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,13 @@
+# HNSW index of the study_kb collection (Chroma 1.x `configuration` form).
+# Shared by vector_store.py and preprocess_kb.py; no other imports, so
+# `python src/services/preprocess_kb.py` can still load it as a sibling module.
+# space / max_neighbors / ef_construction are fixed when the collection is created;
+# Chroma's own defaults (and what the shipped vector-db has) are 16 / 100 / 100.
+HNSW_CONFIG = {
+    "hnsw": {
+        "space": "l2",
+        "max_neighbors": 32,
+        "ef_construction": 200,
+        "ef_search": 100,
+    }
+}
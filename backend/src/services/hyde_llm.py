@@ -1,33 +1,30 @@
-import os
-import json
-from dotenv import load_dotenv
-from groq import Groq
+import functools
 
-# Load API key
-load_dotenv()
+import orjson
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("GROQ_API_KEY is not set in your .env file")
-
-client = Groq(api_key=GROQ_API_KEY)
+from src.services.cache import cache_get, cache_set, make_key
+from src.services.groq_client import get_client, get_sync_client
 
 # ============================================================
 # HYDE DOCUMENT GENERATION
 # ============================================================
-def generate_hyde_document(topic: str) -> str:
-    """
-    HYDE = Hypothetical Document Embedding
-    Generates a synthetic explanation of a topic that looks like
-    textbook material, improving retrieval quality.
-    """
+HYDE_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"   # ✅ A real, current Groq model
 
-    system_prompt = (
-        "You are an academic assistant. "
-        "Given a topic, generate a short hypothetical explanation as if from a textbook. "
-        "Keep it factual, structured, and instructional."
-    )
+# 1–2 paragraphs never need more than this
+HYDE_MAX_TOKENS = 512
+
+# Bump when a prompt / parser change makes old cached results invalid
+HYDE_CACHE_VERSION = "hyde-v1"
+TOPICS_CACHE_VERSION = "topics-v2"   # v2: code fences stripped before JSON parsing
 
+HYDE_SYSTEM_PROMPT = (
+    "You are an academic assistant. "
+    "Given a topic, generate a short hypothetical explanation as if from a textbook. "
+    "Keep it factual, structured, and instructional."
+)
+
+
+def _hyde_messages(topic: str) -> list:
     user_prompt = f"""
 Generate a hypothetical academic explanation for the topic:
 
@@ -37,18 +34,59 @@ TOPIC:
 Write 1–2 paragraphs that resemble real study material.
 Do NOT mention that this is hypothetical.
 """
+    return [
+        {"role": "system", "content": HYDE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    response = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",   # ✅ A real, current Groq model
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+
+@functools.lru_cache(maxsize=1024)
+def generate_hyde_document(topic: str) -> str:
+    """
+    HYDE = Hypothetical Document Embedding
+    Generates a synthetic explanation of a topic that looks like
+    textbook material, improving retrieval quality.
+    Results are cached in-process and on disk, keyed by sha256(topic).
+    """
+    key = make_key(HYDE_CACHE_VERSION, HYDE_MODEL, topic)
+    cached = cache_get("hyde_cache", key)
+    if cached is not None:
+        return cached
+
+    response = get_sync_client().chat.completions.create(
+        model=HYDE_MODEL,
+        messages=_hyde_messages(topic),
         temperature=0.2,
+        max_tokens=HYDE_MAX_TOKENS,
     )
 
     message = response.choices[0].message
-    return message["content"] if isinstance(message, dict) else message.content
+    content = message["content"] if isinstance(message, dict) else message.content
+    cache_set("hyde_cache", key, content)
+    return content
+
+
+async def generate_hyde_document_async(topic: str) -> str:
+    """
+    Async version of generate_hyde_document (used by the notes pipeline).
+    Shares the same on-disk cache.
+    """
+    key = make_key(HYDE_CACHE_VERSION, HYDE_MODEL, topic)
+    cached = cache_get("hyde_cache", key)
+    if cached is not None:
+        return cached
+
+    response = await get_client().chat.completions.create(
+        model=HYDE_MODEL,
+        messages=_hyde_messages(topic),
+        temperature=0.2,
+        max_tokens=HYDE_MAX_TOKENS,
+    )
+
+    message = response.choices[0].message
+    content = message["content"] if isinstance(message, dict) else message.content
+    cache_set("hyde_cache", key, content)
+    return content
 
 
 # ============================================================
@@ -59,6 +97,23 @@ def parse_syllabus_into_topics(syllabus_text: str) -> list:
     Converts raw syllabus text into a structured topic list.
     Always attempts JSON parsing; falls back gracefully.
     """
+    # Copy so callers can't mutate the cached value
+    return list(_parse_syllabus_cached(syllabus_text))
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_syllabus_cached(syllabus_text: str) -> tuple:
+    key = make_key(TOPICS_CACHE_VERSION, HYDE_MODEL, syllabus_text)
+    cached = cache_get("topics_cache", key)
+    if cached is not None:
+        return tuple(orjson.loads(cached))
+
+    topics = _parse_syllabus_with_llm(syllabus_text)
+    cache_set("topics_cache", key, orjson.dumps(topics).decode())
+    return tuple(topics)
+
+
+def _parse_syllabus_with_llm(syllabus_text: str) -> list:
 
     system_prompt = (
         "You extract topics from syllabus text. "
@@ -74,8 +129,8 @@ Output MUST be valid JSON list, example:
 ["Topic 1", "Topic 2", "Topic 3"]
 """
 
-    response = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",   # Same stable model
+    response = get_sync_client().chat.completions.create(
+        model=HYDE_MODEL,   # Same stable model
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
@@ -85,17 +140,21 @@ Output MUST be valid JSON list, example:
 
     raw = response.choices[0].message.content
 
+    # The model often wraps the list in ```json ... ``` fences
+    cleaned = raw.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
     # Try converting to JSON
     try:
-        data = json.loads(raw)
-        if isinstance(data, list):
-            return data
-    except:
-        pass
+        data = orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        data = None
+
+    if isinstance(data, list):
+        return data
 
     # Fallback: return line split
     return [
         line.strip("-• ").strip()
-        for line in raw.split("\n")
+        for line in cleaned.split("\n")
         if len(line.strip()) > 2
     ]
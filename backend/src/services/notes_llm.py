@@ -1,26 +1,46 @@
 import os
 import re
-from typing import List, Dict, Optional
+import asyncio
+import functools
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
-from dotenv import load_dotenv
-from groq import Groq
+import jinja2
+import tiktoken
+
+try:
+    import uvloop
+except ImportError:  # e.g. Windows: stay on the default asyncio loop
+    uvloop = None
+
+from src.config import settings
 
 # Import your existing services
-from src.services.hyde_llm import generate_hyde_document
-from src.services.vector_store import retrieve_relevant_context
+from src.services.groq_client import close_client, get_client
+from src.services.hyde_llm import generate_hyde_document_async
+from src.services.vector_store import retrieve_relevant_context_batch_async
+
+# Max Groq calls in flight per worker process, shared by ALL requests
+# (keeps us under the RPM limit no matter how many requests run at once)
+CONCURRENCY_LIMIT = 5
 
-load_dotenv()
+_groq_sem: Optional[asyncio.Semaphore] = None
+_groq_sem_loop: Optional[asyncio.AbstractEventLoop] = None
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("GROQ_API_KEY is missing in .env")
+# Output budget per unit: a base for overview/summary/questions + a share per subtopic
+MAX_NOTES_TOKENS = 6000
+BASE_NOTES_TOKENS = 800
+TOKENS_PER_SUBTOPIC = 350
 
-client = Groq(api_key=GROQ_API_KEY)
+# Tokenizer used to budget retrieved context (loaded once, on first use)
+TOKENIZER_NAME = "cl100k_base"
+CHARS_PER_TOKEN = 4  # rough budget when the tokenizer can't be loaded
 
-# Using a larger model if available (70b) is better for formatting compliance, 
-# otherwise sticking to 8b-instant.
-MODEL_NAME = "meta-llama/llama-4-scout-17b-16e-instruct" 
-# Fallback to "llama-3.1-8b-instant" if rate limits are an issue.
+# Compiled once at import, reused for every request
+# Robust regex for unit headers: 'UNIT-1', 'UNIT I', 'Unit 1', etc.
+_UNIT_RE = re.compile(r"(UNIT[\s\-]*(?:[IVX]+|\d+))[:\s]*", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+# Common delimiters used in syllabus
+_DELIM_RE = re.compile(r"[.,;]|\sand\s|\sor\s|\n")
 
 # -------------------------------------------------
 # 1. Syllabus Parsing Utilities
@@ -31,10 +51,7 @@ def split_syllabus_into_units(syllabus_text: str) -> List[Dict[str, str]]:
     Handles 'UNIT-1', 'UNIT I', 'Unit 1', etc.
     """
     text = syllabus_text.replace("\r", " ").strip()
-    # Robust regex for unit headers
-    pattern = r"(?i)(UNIT[\s\-]*(?:[IVX]+|\d+))[:\s]*"
-    
-    parts = re.split(pattern, text)
+    parts = _UNIT_RE.split(text)
     
     # If split didn't work (no clear markers), return whole text as one unit
     if len(parts) < 2:
@@ -60,325 +77,422 @@ def extract_subtopics(unit_text: str) -> List[str]:
     Extracts individual subtopics for the LLM to focus on.
     """
     # Clean text
-    text = re.sub(r"\s+", " ", unit_text)
+    text = _WS_RE.sub(" ", unit_text)
     # Split by common delimiters used in syllabus
-    raw_parts = re.split(r"[.,;]|\sand\s|\sor\s|\n", text)
+    raw_parts = _DELIM_RE.split(text)
     # Filter out empty or too short strings
     subtopics = [p.strip(" -–—:•") for p in raw_parts if len(p.strip()) > 3]
-    return list(set(subtopics)) # Deduplicate
+    return list(dict.fromkeys(subtopics)) # Deduplicate, keeping syllabus order
 
 
-def _truncate_context(text: str, max_chars: int = 6000) -> str:
+@functools.lru_cache(maxsize=1)
+def _encoder():
     """
-    Truncates context to ensure we don't hit token limits while keeping key info.
+    tiktoken downloads the BPE file on first load; without network access
+    fall back to a character budget instead of failing the whole module.
     """
-    if len(text) <= max_chars:
-        return text
-    return text[:max_chars] + "\n\n...[context truncated]..."
+    try:
+        return tiktoken.get_encoding(TOKENIZER_NAME)
+    except Exception as e:
+        print(f"[WARN] tiktoken unavailable, truncating by characters: {e}")
+        return None
 
 
-# -------------------------------------------------
-# 2. Core Note Generation Logic
-# -------------------------------------------------
-def generate_unit_notes(
-    unit_title: str,
-    unit_text: str,
-    subject: Optional[str],
-    use_pyq: bool,
-    top_k: int,
-) -> str:
+def _truncate_context(text: str, max_tokens: int = 3500) -> str:
     """
-    Generates detailed, textbook-style notes for a single unit.
+    Truncates context to ensure we don't hit token limits while keeping key info.
+    Counts real tokens, so the cut always lands on a token boundary
+    (about CHARS_PER_TOKEN chars per token if tiktoken is unavailable).
     """
-    subtopics = extract_subtopics(unit_text)
-    
-    # 1. Semantic Search Prep (HyDE)
-    hyde_seed = f"Explain the concepts of {unit_title} in {subject or 'Data Science'}: {unit_text}"
-    hyde_doc = generate_hyde_document(hyde_seed)
-
-    # 2. Retrieve Context (RAG)
-    # Concepts
-    book_context = retrieve_relevant_context(
-        syllabus_text=hyde_doc,
-        subject=subject,
-        use_pyq=False,
-        top_k=min(top_k, 25),
-    )
-    # Previous Year Questions (if enabled)
-    pyq_context = ""
-    if use_pyq:
-        pyq_raw = retrieve_relevant_context(
-            syllabus_text=hyde_doc,
-            subject=subject,
-            use_pyq=True,
-            top_k=5,
-        )
-        pyq_context = f"\nRELEVANT PAST EXAM QUESTIONS:\n{pyq_raw}\n"
-
-    # Truncate to fit context window
-    book_context = _truncate_context(book_context, 5000)
-    
-    # 3. Construct the Prompt
-    subtopic_list_str = "\n".join([f"- {s}" for s in subtopics])
-
-    system_prompt = """You are an expert academic author and university professor. 
-    You create high-quality, comprehensive study notes that look like they come from a premium textbook.
-
-    # **YOUR GOAL:** 
-    Convert the provided syllabus into **detailed, structured, and visually scannable notes**.
-
-    ---
-
-    # **FORMATTING RULES:**
-
-    ## **1. Hierarchy & Headers**
-    - **`#` (H1):** Unit titles - use for major divisions
-    - **`##` (H2):** Main topics - primary concepts within the unit
-    - **`###` (H3):** Sub-sections - detailed breakdowns
-    - **`####` (H4):** Supporting details when needed
-
-    ## **2. Visual Elements**
-    - **MUST include:** ASCII diagrams or Mermaid syntax for all processes
-    - **Example:** `Input → Processing → Output` or flowcharts
-    - **Use:** Boxes, arrows, and visual representations for complex workflows
-
-    ## **3. Mathematical Notation**
-    - **ALL formulas** must use LaTeX formatting
-    - **Example:** `$y = mx + c$`, `$E = mc^2$`
-    - **Display equations:** Use `$$...$$` for centered, standalone formulas
-
-    ## **4. Tables & Comparisons**
-    - **Use Markdown tables** to compare concepts side-by-side
-    - **Example topics:** Supervised vs Unsupervised, Stack vs Queue
-    - **Format:** Clear headers, aligned columns, concise entries
-
-    ## **5. Emphasis & Readability**
-    - **Bold (`**text**`):** Key terms, definitions, important concepts
-    - **Italic (`*text*`):** Emphasis, variables, first-use terminology
-    - **Blockquotes (`>`):** Formal definitions, important notes
-    - **Lists:** Use for features, steps, characteristics
-
-    ## **6. Professional Writing**
-    - **NO fluff** or robotic transitions like "Let's dive into..."
-    - **Write directly** and professionally
-    - **Focus:** Educational clarity over conversational style
-
-    ---
-
-    # **TONE:** 
-    Educational, insightful, and clear—similar to 'Head First' series or premium university textbooks.
+    enc = _encoder()
+    if enc is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars] + "\n\n...[context truncated]..."
+
+    ids = enc.encode(text)
+    if len(ids) <= max_tokens:
+        return text
+    return enc.decode(ids[:max_tokens]) + "\n\n...[context truncated]..."
 
-    ---
 
-    # **CONTENT DEPTH:**
-    - **Explanations:** Focus on "WHY" and "HOW," not just "WHAT"
-    - **Examples:** Real-world applications and specific scenarios
-    - **Visuals:** Minimum 1-2 diagrams per major topic
-    - **Comparisons:** Tables for easily confused concepts
+def _groq_limiter() -> asyncio.Semaphore:
     """
+    Process-wide semaphore for Groq calls. Semaphores are tied to an event loop,
+    so it is rebuilt when the loop changes (the sync wrapper runs each call on a new one).
+    """
+    global _groq_sem, _groq_sem_loop
+    loop = asyncio.get_running_loop()
+    if _groq_sem is None or _groq_sem_loop is not loop:
+        _groq_sem, _groq_sem_loop = asyncio.Semaphore(CONCURRENCY_LIMIT), loop
+    return _groq_sem
 
-    user_prompt = f"""
-    # **CONTEXT:**
-    - **Subject:** {subject or "General"}
-    - **Unit:** {unit_title}
-    - **Syllabus Topics:** 
-    {unit_text}
-
-    ---
-
-    # **RETRIEVED KNOWLEDGE BASE (Source Material):**
-    {book_context}
-
-    {pyq_context}
-
-    ---
-
-    # **TASK:** 
-    Write **comprehensive study notes** for **{unit_title}**. 
-
-    ---
-
-    # **REQUIRED STRUCTURE** (Follow this exactly):
-
-    ---
-
-    # **{unit_title}** - [Topic Name]
-
-    > **Unit Overview:** Write a 3-4 sentence summary of what this unit covers and why it matters in the real world.
-
-    ---
-
-    ## **[Topic 1 Name]**
-
-    ### **1. Definition**
-    > [Provide a clear, formal definition in a blockquote]
-
-    ### **2. Conceptual Explanation**
-    [2-3 paragraphs explaining the concept in depth. Explain **"Why"** we need it, not just **"What"** it is.]
-
-    ### **3. Key Characteristics/Features**
-    - **Feature 1:** [Description]
-    - **Feature 2:** [Description]
-    - **Feature 3:** [Description]
-
-    ### **4. Process/Workflow** (IF APPLICABLE)
-    [If this is a process/algorithm, describe steps **AND** provide a visual representation]
-
-    **Visual Representation:**
-    ```
-    [Step 1] → [Step 2] → [Decision] → [Outcome]
-    ```
-
-    **Step-by-Step Breakdown:**
-    1. **Step 1:** [Description]
-    2. **Step 2:** [Description]
-    3. **Step 3:** [Description]
-
-    ### **5. Real-World Case Study**
-    **Scenario:** [Create a specific scenario]
-
-    **Application:** [Provide detailed explanation of how the concept applies here]
-
-    **Outcome:** [What problem does it solve?]
-
-    ### **6. Applications**
-    - **Industry 1:** [Specific use case]
-    - **Industry 2:** [Specific use case]
-    - **Industry 3:** [Specific use case]
 
-    ---
-    *(Repeat the structure above for every major topic in the syllabus: {subtopic_list_str})*
+def _max_output_tokens(unit_text: str) -> int:
+    """
+    Don't reserve 6000 tokens for a 3-topic unit: Groq schedules by max_tokens.
+    """
+    return min(MAX_NOTES_TOKENS, BASE_NOTES_TOKENS + TOKENS_PER_SUBTOPIC * len(extract_subtopics(unit_text)))
 
-    ---
 
-    ## **Key Differences & Comparisons**
+def _build_retrieval_query(
+    unit_title: str,
+    unit_text: str,
+    subtopics: List[str],
+    subject: Optional[str],
+) -> str:
+    """
+    Local query expansion (no LLM call): raw unit text plus its subtopics
+    as keywords, so the embedding leans towards the concepts of the unit.
+    """
+    keywords = ", ".join(subtopics)
+    return f"{subject or 'General'} - {unit_title}: {unit_text}\nKey concepts: {keywords}"
 
-    [Create 1-2 comparison tables for confusing topics in this unit]
 
-    ### **Comparison: [Concept A] vs [Concept B]**
+# -------------------------------------------------
+# 2. Core Note Generation Logic
+# -------------------------------------------------
+# Prompts live in src/templates/ and are compiled once at import.
+# The system prompt is identical for every unit, so it is rendered once; Groq can
+# reuse the cached prefix and each call only sends the unit-specific user message.
+_TEMPLATES = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(os.path.join(os.path.dirname(__file__), "..", "templates")),
+    auto_reload=False,
+    keep_trailing_newline=True,
+    cache_size=400,
+)
+_UNIT_PROMPT = _TEMPLATES.get_template("unit_prompt.j2")
+SYSTEM_PROMPT = _TEMPLATES.get_template("system_prompt.j2").render()
+
+
+async def _unit_query(
+    unit: Dict[str, str],
+    subject: Optional[str],
+    sem: asyncio.Semaphore,
+) -> str:
+    """
+    Retrieval query for one unit (HyDE document if enabled, else local expansion).
+    """
+    unit_title, unit_text = unit["unit_title"], unit["unit_text"]
+    if not settings().use_hyde:
+        return _build_retrieval_query(unit_title, unit_text, extract_subtopics(unit_text), subject)
 
-    | **Feature** | **Concept A** | **Concept B** |
-    |:-----------|:-------------|:-------------|
-    | **Purpose** | ... | ... |
-    | **Use Case** | ... | ... |
-    | **Advantages** | ... | ... |
-    | **Disadvantages** | ... | ... |
+    hyde_seed = f"Explain the concepts of {unit_title} in {subject or 'Data Science'}: {unit_text}"
+    async with sem:
+        return await generate_hyde_document_async(hyde_seed)
 
-    ---
 
-    ## **Chapter Summary & Revision**
+async def _retrieve_unit_contexts(
+    units: List[Dict[str, str]],
+    subject: Optional[str],
+    use_pyq: bool,
+    top_k: int,
+    sem: asyncio.Semaphore,
+) -> Tuple[List[str], List[str]]:
+    """
+    Retrieval for ALL units: one batched Chroma query for books and one for PYQs.
+    Returns (book_contexts, pyq_contexts), indexed like `units`.
+    """
+    # 1. Semantic Search Prep
+    queries = await asyncio.gather(*[_unit_query(u, subject, sem) for u in units])
 
-    ### **Key Takeaways:**
-    - **Takeaway 1:** [Concise summary point]
-    - **Takeaway 2:** [Concise summary point]
-    - **Takeaway 3:** [Concise summary point]
+    # 2. Retrieve Context (RAG)
+    # Book and PYQ lookups only depend on the queries, so run them together
+    coros = [
+        # Concepts
+        retrieve_relevant_context_batch_async(
+            queries=queries,
+            subject=subject,
+            use_pyq=False,
+            # Hybrid retrieval has better recall, so fewer chunks are enough
+            top_k=min(top_k, 20),
+        )
+    ]
+    if use_pyq:
+        # Previous Year Questions (if enabled)
+        coros.append(
+            retrieve_relevant_context_batch_async(
+                queries=queries,
+                subject=subject,
+                use_pyq=True,
+                top_k=5,
+            )
+        )
+    book_contexts, *pyq = await asyncio.gather(*coros)
 
-    ### **Important Formulae:**
-    - **Formula 1:** $[LaTeX equation]$ - [Brief explanation]
-    - **Formula 2:** $[LaTeX equation]$ - [Brief explanation]
+    pyq_contexts = pyq[0] if pyq else [""] * len(units)
+    return book_contexts, pyq_contexts
 
-    ### **Must-Remember Points:**
-    - **Point 1**
-    - **Point 2**
-    - **Point 3**
 
-    ---
+def _build_unit_messages(
+    unit_title: str,
+    unit_text: str,
+    subject: Optional[str],
+    book_context: str,
+    pyq_context: str,
+) -> List[Dict[str, str]]:
+    """
+    Builds the chat messages for one unit from its retrieved context.
+    """
+    subtopics = extract_subtopics(unit_text)
 
-    ## **Practice Questions** (Based on Exam Patterns)
+    if pyq_context:
+        pyq_context = f"\nRELEVANT PAST EXAM QUESTIONS:\n{pyq_context}\n"
 
-    ### **Conceptual Questions:**
-    1. [Question testing understanding of definitions and concepts]
-    2. [Question requiring explanation of relationships]
+    # Truncate to fit context window
+    book_context = _truncate_context(book_context, 3500)
+    
+    # 3. Construct the Prompt
+    subtopic_list_str = "\n".join([f"- {s}" for s in subtopics])
 
-    ### **Application Questions:**
-    3. [Scenario-based question requiring practical application]
-    4. [Problem requiring selection of appropriate approach]
+    user_prompt = _UNIT_PROMPT.render(
+        subject=subject,
+        unit_title=unit_title,
+        unit_text=unit_text,
+        book_context=book_context,
+        pyq_context=pyq_context,
+        subtopic_list_str=subtopic_list_str,
+    )
 
-    ### **Problem-Solving Questions:**
-    5. [Numerical/algorithmic problem]
-    6. [Design/implementation scenario]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    ---
 
-    **END OF NOTES**
+async def generate_unit_notes(
+    unit_title: str,
+    unit_text: str,
+    subject: Optional[str],
+    book_context: str,
+    pyq_context: str = "",
+) -> str:
     """
+    Generates detailed, textbook-style notes for a single unit.
+    """
+    messages = _build_unit_messages(unit_title, unit_text, subject, book_context, pyq_context)
 
     # 4. Call LLM
     try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        response = await get_client().chat.completions.create(
+            model=settings().notes_model,
+            messages=messages,
             temperature=0.3, # Low temp for factual accuracy
-            max_tokens=6000, # Allow long output
+            max_tokens=_max_output_tokens(unit_text), # Long output, sized to the unit
         )
         return response.choices[0].message.content
     except Exception as e:
         return f"# Error Generating Notes for {unit_title}\n\nTechnical error: {str(e)}"
 
 
+async def stream_unit_notes(
+    unit_title: str,
+    unit_text: str,
+    subject: Optional[str],
+    book_context: str,
+    pyq_context: str = "",
+) -> AsyncIterator[str]:
+    """
+    Same as generate_unit_notes, but yields the markdown as Groq generates it.
+    """
+    messages = _build_unit_messages(unit_title, unit_text, subject, book_context, pyq_context)
+
+    try:
+        stream = await get_client().chat.completions.create(
+            model=settings().notes_model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=_max_output_tokens(unit_text),
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+    except Exception as e:
+        yield f"\n\n# Error Generating Notes for {unit_title}\n\nTechnical error: {str(e)}"
+
+
 # -------------------------------------------------
 # 3. Final Orchestrator
 # -------------------------------------------------
-def generate_final_notes(
-    syllabus_text: str,
-    subject: Optional[str] = None,
-    use_pyq: bool = False,
-    top_k: int = 40,
-) -> str:
-    """
-    Main entry point to generate the full subject notes.
-    """
-    # 1. Parse Syllabus
+def _parse_units(syllabus_text: str) -> List[Dict[str, str]]:
     units = split_syllabus_into_units(syllabus_text)
     if not units:
         # Fallback if regex fails completely
         units = [{"unit_title": "Complete Syllabus", "unit_text": syllabus_text}]
+    return units
 
-    # 2. Generate content for each unit
-    all_unit_content: List[str] = []
-    
-    # Progress indication (for console logs)
-    print(f"Found {len(units)} units. Generating notes...")
-
-    for unit in units:
-        print(f"Processing {unit['unit_title']}...")
-        unit_content = generate_unit_notes(
-            unit_title=unit["unit_title"],
-            unit_text=unit["unit_text"],
-            subject=subject,
-            use_pyq=use_pyq,
-            top_k=top_k,
-        )
-        all_unit_content.append(unit_content)
 
-    # 3. Assemble Final Document
+def _notes_header(subject: Optional[str], units: List[Dict[str, str]]) -> str:
     subject_header = subject.upper() if subject else "SUBJECT NOTES"
-    
-    final_markdown = f"""
+
+    parts: List[str] = [f"""
 # {subject_header}
 **Comprehensive Study Notes & Exam Preparation**
 
 ---
 
 ## Table of Contents
-"""
+"""]
     # Dynamic TOC
     for unit in units:
-        final_markdown += f"- [{unit['unit_title']}](#{unit['unit_title'].lower().replace(' ', '-').replace(':', '')})\n"
-    
-    final_markdown += "\n---\n"
-    
-    # Append all unit contents
-    final_markdown += "\n\n".join(all_unit_content)
-    
-    final_markdown += f"""
+        parts.append(f"- [{unit['unit_title']}](#{unit['unit_title'].lower().replace(' ', '-').replace(':', '')})\n")
+
+    parts.append("\n---\n")
+    return "".join(parts)
+
+
+def _notes_footer(subject: Optional[str]) -> str:
+    subject_header = subject.upper() if subject else "SUBJECT NOTES"
+    return f"""
 \n
 ---
 **End of Notes**
 *Generated by SyllabusGPT | {subject_header}*
 """
 
-    return final_markdown
\ No newline at end of file
+
+async def generate_final_notes_async(
+    syllabus_text: str,
+    subject: Optional[str] = None,
+    use_pyq: bool = False,
+    top_k: int = 20,
+) -> str:
+    """
+    Main entry point to generate the full subject notes.
+    Units are independent, so they are generated concurrently.
+    """
+    # 1. Parse Syllabus
+    units = _parse_units(syllabus_text)
+
+    # 2. Generate content for each unit
+    # Progress indication (for console logs)
+    print(f"Found {len(units)} units. Generating notes...")
+
+    sem = _groq_limiter()
+    book_contexts, pyq_contexts = await _retrieve_unit_contexts(units, subject, use_pyq, top_k, sem)
+
+    async def _bounded(i: int) -> str:
+        async with sem:
+            print(f"Processing {units[i]['unit_title']}...")
+            return await generate_unit_notes(
+                unit_title=units[i]["unit_title"],
+                unit_text=units[i]["unit_text"],
+                subject=subject,
+                book_context=book_contexts[i],
+                pyq_context=pyq_contexts[i],
+            )
+
+    if len(units) == 1:
+        # Nothing to overlap: skip the task / gather overhead
+        all_unit_content = [await _bounded(0)]
+    else:
+        # gather() keeps the results in the same order as the units
+        all_unit_content: List[str] = await asyncio.gather(*[_bounded(i) for i in range(len(units))])
+
+    # 3. Assemble Final Document
+    return "".join([
+        _notes_header(subject, units),
+        "\n\n".join(all_unit_content),
+        _notes_footer(subject),
+    ])
+
+
+async def stream_final_notes(
+    syllabus_text: str,
+    subject: Optional[str] = None,
+    use_pyq: bool = False,
+    top_k: int = 20,
+) -> AsyncIterator[str]:
+    """
+    Streaming version of generate_final_notes_async.
+    Header + TOC go out immediately. All units generate concurrently into
+    their own queue, and are emitted in syllabus order: the current unit
+    streams live while the later ones buffer.
+    """
+    units = _parse_units(syllabus_text)
+    print(f"Found {len(units)} units. Streaming notes...")
+
+    yield _notes_header(subject, units)
+
+    sem = _groq_limiter()
+    book_contexts, pyq_contexts = await _retrieve_unit_contexts(units, subject, use_pyq, top_k, sem)
+
+    if len(units) == 1:
+        # Single unit: stream it straight through, no producer task / queue
+        # (still under the shared limiter, like every other Groq call)
+        async with sem:
+            async for piece in stream_unit_notes(
+                unit_title=units[0]["unit_title"],
+                unit_text=units[0]["unit_text"],
+                subject=subject,
+                book_context=book_contexts[0],
+                pyq_context=pyq_contexts[0],
+            ):
+                yield piece
+        yield _notes_footer(subject)
+        return
+
+    queues: List[asyncio.Queue] = [asyncio.Queue() for _ in units]
+
+    async def _produce(i: int):
+        async with sem:
+            print(f"Processing {units[i]['unit_title']}...")
+            try:
+                async for piece in stream_unit_notes(
+                    unit_title=units[i]["unit_title"],
+                    unit_text=units[i]["unit_text"],
+                    subject=subject,
+                    book_context=book_contexts[i],
+                    pyq_context=pyq_contexts[i],
+                ):
+                    await queues[i].put(piece)
+            finally:
+                await queues[i].put(None)  # end-of-unit marker
+
+    producers = [asyncio.create_task(_produce(i)) for i in range(len(units))]
+    try:
+        for i, queue in enumerate(queues):
+            if i:
+                yield "\n\n"
+            while (piece := await queue.get()) is not None:
+                yield piece
+            # Re-raise unexpected failures for this unit
+            await producers[i]
+
+        yield _notes_footer(subject)
+    finally:
+        # Client disconnected or a unit failed: stop the remaining work
+        for task in producers:
+            task.cancel()
+
+
+def generate_final_notes(
+    syllabus_text: str,
+    subject: Optional[str] = None,
+    use_pyq: bool = False,
+    top_k: int = 20,
+) -> str:
+    """
+    Sync wrapper around generate_final_notes_async (for scripts / sync callers).
+    Do not call from inside a running event loop.
+    Uses uvloop when available (uvicorn already does so for the API server).
+    """
+    async def _run_once() -> str:
+        try:
+            return await generate_final_notes_async(
+                syllabus_text=syllabus_text,
+                subject=subject,
+                use_pyq=use_pyq,
+                top_k=top_k,
+            )
+        finally:
+            # The pooled connections belong to this loop, which closes on return;
+            # drop them so the next call builds a fresh client on its own loop.
+            await close_client()
+
+    coro = _run_once()
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
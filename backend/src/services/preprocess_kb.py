@@ -11,6 +11,11 @@ from pdfminer.high_level import extract_text
 from sentence_transformers import SentenceTransformer
 from chromadb import PersistentClient
 
+try:
+    from src.services.hnsw_config import HNSW_CONFIG
+except ImportError:  # run as a script: python src/services/preprocess_kb.py
+    from hnsw_config import HNSW_CONFIG
+
 # ==== PATHS ====
 RAW_DIR = "./knowledgebase/raw_files"
 PROCESSED_DIR = "./knowledgebase/processed"
@@ -22,7 +27,7 @@ easy_reader = easyocr.Reader(['en'], gpu=False)     # OCR for scanned PDFs
 
 # ==== CHROMA CLIENT ====
 client = PersistentClient(path=VECTOR_DB_DIR)
-collection = client.get_or_create_collection("study_kb")
+collection = client.get_or_create_collection("study_kb", configuration=HNSW_CONFIG)
 
 
 # ---------- SUBJECT DETECTION ----------
@@ -1,26 +1,15 @@
-import os
 from typing import List, Optional
 
-from dotenv import load_dotenv
-from groq import Groq
-
+from src.services.groq_client import get_sync_client
 from src.services.hyde_llm import generate_hyde_document
 from src.services.vector_store import retrieve_relevant_context
 
-load_dotenv()
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("GROQ_API_KEY is not set in the environment (.env)")
-
-client = Groq(api_key=GROQ_API_KEY)
-
 
 def _call_groq_chat(system_prompt: str, user_prompt: str, temperature: float = 0.1) -> str:
     """
     Small helper to call Groq LLM.
     """
-    resp = client.chat.completions.create(
+    resp = get_sync_client().chat.completions.create(
         model="meta-llama/llama-4-scout-17b-16e-instruct",
         messages=[
             {"role": "system", "content": system_prompt},
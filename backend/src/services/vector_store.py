@@ -1,16 +1,39 @@
+import asyncio
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
 import chromadb
+import numpy as np
 from chromadb import PersistentClient
+from rank_bm25 import BM25Okapi
 from sentence_transformers import SentenceTransformer
 
+from src.services.cache import cache_get, cache_set, make_key
+from src.services.hnsw_config import HNSW_CONFIG
+
 # === Paths ===
 VECTOR_DB_DIR = "./vector-db"
 
 # === Embedding Model ===
-embedder = SentenceTransformer("all-MiniLM-L6-v2")  # must match preprocess embeddings
+EMBED_MODEL = "all-MiniLM-L6-v2"  # must match preprocess embeddings
+embedder = SentenceTransformer(EMBED_MODEL)
 
 # === ChromaDB Client ===
 client = PersistentClient(path=VECTOR_DB_DIR)
-collection = client.get_or_create_collection("study_kb")
+collection = client.get_or_create_collection("study_kb", configuration=HNSW_CONFIG)
+
+# === Worker pool for blocking Chroma / embedder calls ===
+# Lets several units' retrievals overlap (Chroma + torch release the GIL)
+# without competing with FastAPI's own threadpool.
+RETRIEVAL_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+# === Hybrid retrieval (BM25 + vectors, fused with Reciprocal Rank Fusion) ===
+RRF_K = 60
+CANDIDATE_MULTIPLIER = 2   # each retriever contributes top_k * 2 candidates
+_TOKEN_RE = re.compile(r"\w+")
 
 
 # ---------------------------------------------------------
@@ -40,8 +63,37 @@ def retrieve_relevant_context(
     ):
     """
     Retrieves the most relevant BOOK or PYQ chunks based on the given syllabus text.
+    Hybrid: vector + BM25 candidates are fused with RRF before taking top_k.
+    Cached on (text, subject, use_pyq, top_k); the collection size is part of the
+    key so re-ingesting the KB invalidates old entries.
     """
+    return _retrieve_cached(syllabus_text, subject, use_pyq, top_k, collection.count())
+
 
+def _retrieval_key(syllabus_text: str, subject: str, use_pyq: bool, top_k: int, kb_size: int) -> str:
+    """Cache key shared by the single and batched retrieval paths."""
+    return make_key("hybrid", EMBED_MODEL, syllabus_text, subject, use_pyq, top_k, kb_size)
+
+
+@functools.lru_cache(maxsize=1024)
+def _retrieve_cached(
+        syllabus_text: str,
+        subject: str,
+        use_pyq: bool,
+        top_k: int,
+        kb_size: int
+    ):
+    key = _retrieval_key(syllabus_text, subject, use_pyq, top_k, kb_size)
+    cached = cache_get("retrieval_cache", key)
+    if cached is not None:
+        return cached
+
+    context = _query_context(syllabus_text, subject, use_pyq, top_k)
+    cache_set("retrieval_cache", key, context)
+    return context
+
+
+def _build_where_filter(subject: str = None, use_pyq: bool = False):
     ### Fix: Chroma expects only ONE operator in "where"
     ### So we use a nested operator "$and"
     
@@ -57,14 +109,158 @@ def retrieve_relevant_context(
     if len(where_filter["$and"]) == 1:
         where_filter = where_filter["$and"][0]
 
+    return where_filter
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@functools.lru_cache(maxsize=32)
+def _bm25_index(subject: str, use_pyq: bool, kb_size: int):
+    """
+    BM25 index over the same chunks the vector search can return (same where-filter).
+    Built on first use per (subject, type); kb_size invalidates it after re-ingestion.
+    """
+    items = collection.get(where=_build_where_filter(subject, use_pyq), include=["documents"])
+    ids, docs = items["ids"], items["documents"]
+    bm25 = BM25Okapi([_tokenize(d) for d in docs]) if docs else None
+    return bm25, ids, docs
+
+
+def warm_bm25_index(subject: str = None):
+    """
+    Builds the BOOK and PYQ BM25 indexes ahead of the first request (app startup).
+    Indexes for other subjects are still built on their first use.
+    """
+    kb_size = collection.count()
+    for use_pyq in (False, True):
+        _bm25_index(subject, use_pyq, kb_size)
+
+
+def _bm25_search(query: str, subject: str, use_pyq: bool, n_results: int):
+    """Returns (ids, docs) of the top BM25 matches, best first."""
+    bm25, ids, docs = _bm25_index(subject, use_pyq, collection.count())
+    if bm25 is None:
+        return [], []
+
+    scores = bm25.get_scores(_tokenize(query))
+    top = [i for i in np.argsort(scores)[::-1][:n_results] if scores[i] > 0]
+    return [ids[i] for i in top], [docs[i] for i in top]
+
+
+def _rrf_fuse(rankings, top_k: int) -> List[str]:
+    """
+    Reciprocal Rank Fusion: score(doc) = sum over retrievers of 1 / (RRF_K + rank).
+    `rankings` is a list of (ids, docs) pairs, each ordered best first.
+    """
+    scores, texts = {}, {}
+    for ids, docs in rankings:
+        for rank, (doc_id, doc) in enumerate(zip(ids, docs), start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_K + rank)
+            texts[doc_id] = doc
+
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [texts[doc_id] for doc_id in best]
+
+
+def _query_context(
+        syllabus_text: str,
+        subject: str = None,
+        use_pyq: bool = False,
+        top_k: int = 10
+    ):
+    n_candidates = top_k * CANDIDATE_MULTIPLIER
     query_embedding = embedder.encode([syllabus_text])[0].tolist()
 
     results = collection.query(
         query_embeddings=[query_embedding],
-        n_results=top_k,
-        where=where_filter
+        n_results=n_candidates,
+        where=_build_where_filter(subject, use_pyq)
     )
 
-    docs = results.get("documents", [[]])[0]
+    vector_hits = (results.get("ids", [[]])[0], results.get("documents", [[]])[0])
+    bm25_hits = _bm25_search(syllabus_text, subject, use_pyq, n_candidates)
+
+    return "\n\n".join(_rrf_fuse([vector_hits, bm25_hits], top_k))
+
+
+# ---------------------------------------------------------
+#  BATCHED CONTEXT RETRIEVAL  (one Chroma call for all units)
+# ---------------------------------------------------------
+def retrieve_relevant_context_batch(
+        queries: List[str],
+        subject: str = None,
+        use_pyq: bool = False,
+        top_k: int = 10
+    ) -> List[str]:
+    """
+    Same as retrieve_relevant_context, for many queries at once.
+    Cache misses are embedded in one batch and sent to Chroma as a single
+    multi-vector query, then fused with BM25 per query.
+    Returns one context string per query, in order.
+    """
+    kb_size = collection.count()
+    keys = [_retrieval_key(q, subject, use_pyq, top_k, kb_size) for q in queries]
+    contexts = [cache_get("retrieval_cache", key) for key in keys]
+
+    missing = [i for i, ctx in enumerate(contexts) if ctx is None]
+    if missing:
+        n_candidates = top_k * CANDIDATE_MULTIPLIER
+        embeddings = embedder.encode([queries[i] for i in missing]).tolist()
+
+        results = collection.query(
+            query_embeddings=embeddings,
+            n_results=n_candidates,
+            where=_build_where_filter(subject, use_pyq)
+        )
+
+        ids_per_query = results.get("ids") or [[] for _ in missing]
+        docs_per_query = results.get("documents") or [[] for _ in missing]
+        for i, ids, docs in zip(missing, ids_per_query, docs_per_query):
+            bm25_hits = _bm25_search(queries[i], subject, use_pyq, n_candidates)
+            contexts[i] = "\n\n".join(_rrf_fuse([(ids, docs), bm25_hits], top_k))
+            cache_set("retrieval_cache", keys[i], contexts[i])
 
-    return "\n\n".join(docs)
+    return contexts
+
+
+async def retrieve_relevant_context_async(
+        syllabus_text: str,
+        subject: str = None,
+        use_pyq: bool = False,
+        top_k: int = 10
+    ):
+    """
+    Non-blocking wrapper: Chroma + the embedder are sync, so run them on the retrieval pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor,
+        functools.partial(
+            retrieve_relevant_context,
+            syllabus_text=syllabus_text,
+            subject=subject,
+            use_pyq=use_pyq,
+            top_k=top_k,
+        ),
+    )
+
+
+async def retrieve_relevant_context_batch_async(
+        queries: List[str],
+        subject: str = None,
+        use_pyq: bool = False,
+        top_k: int = 10
+    ) -> List[str]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor,
+        functools.partial(
+            retrieve_relevant_context_batch,
+            queries=queries,
+            subject=subject,
+            use_pyq=use_pyq,
+            top_k=top_k,
+        ),
+    )